@@ -3,11 +3,15 @@ Main FastAPI application for LLM Quiz Analysis
 Handles incoming quiz requests and orchestrates the quiz-solving process
 """
 import os
+import sys
+import hmac
 import asyncio
-from typing import Dict, Any, Optional
-from datetime import datetime
+import hashlib
+from typing import Dict, Any, Optional, Set
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field, field_validator
 from dotenv import load_dotenv
 import logging
@@ -24,22 +28,60 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="LLM Quiz Analysis API",
-    description="API endpoint for solving LLM-based quiz tasks",
-    version="1.0.0"
-)
-
 # Load configuration from environment
 EXPECTED_SECRET = os.getenv("QUIZ_SECRET", "")
 STUDENT_EMAIL = os.getenv("STUDENT_EMAIL", "")
+MAX_CONCURRENT_QUIZZES = int(os.getenv("MAX_CONCURRENT_QUIZZES", "8"))
+
+# Digest of the expected secret, compared in constant time per request
+_EXPECTED_SECRET_HASH = hashlib.sha256(EXPECTED_SECRET.encode()).digest()
 
 if not EXPECTED_SECRET:
     logger.warning("QUIZ_SECRET not set in environment variables")
 if not STUDENT_EMAIL:
     logger.warning("STUDENT_EMAIL not set in environment variables")
 
+# Accepted quiz URL schemes
+_URL_PREFIXES = ('http://', 'https://')
+
+# Global quiz agent instance
+quiz_agent: Optional[QuizAgent] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create and warm up the quiz agent on startup, release its resources on shutdown"""
+    global quiz_agent
+    try:
+        quiz_agent = QuizAgent()
+        logger.info("Quiz agent initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize quiz agent: {str(e)}")
+        raise
+
+    await quiz_agent.warmup()
+
+    yield
+
+    logger.info("Shutting down application")
+
+    # Stop running quiz chains before releasing the resources they use
+    for task in list(_BG_TASKS):
+        task.cancel()
+    await asyncio.gather(*_BG_TASKS, return_exceptions=True)
+
+    await quiz_agent.aclose()
+
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="LLM Quiz Analysis API",
+    description="API endpoint for solving LLM-based quiz tasks",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
 
 class QuizRequest(BaseModel):
     """Request model for quiz endpoint"""
@@ -47,21 +89,21 @@ class QuizRequest(BaseModel):
     secret: str
     url: str = Field(..., description="Quiz URL to solve")
 
-    # Allow extra fields that might be sent
-    model_config = {"extra": "allow"}
+    # Ignore extra fields that might be sent; nothing downstream reads them
+    model_config = {"extra": "ignore"}
 
-    @classmethod
     @field_validator('email')
+    @classmethod
     def validate_email(cls, v: str) -> str:
         """Simple email validation - check for @ symbol"""
         if '@' not in v:
             raise ValueError('Invalid email format - must contain @')
         return v
 
-    @classmethod
     @field_validator('url')
+    @classmethod
     def validate_url(cls, v: str) -> str:
-        if not v.startswith(('http://', 'https://')):
+        if not v.startswith(_URL_PREFIXES):
             raise ValueError('URL must start with http:// or https://')
         return v
 
@@ -74,26 +116,10 @@ class QuizResponse(BaseModel):
     email: str
 
 
-# Global quiz agent instance
-quiz_agent: Optional[QuizAgent] = None
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize quiz agent on startup"""
-    global quiz_agent
-    try:
-        quiz_agent = QuizAgent()
-        logger.info("Quiz agent initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize quiz agent: {str(e)}")
-        raise
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    logger.info("Shutting down application")
+# Background quiz chains. The set keeps a reference to each task until it
+# finishes, and its size is what handle_quiz checks against
+# MAX_CONCURRENT_QUIZZES to bound how many run at once
+_BG_TASKS: Set[asyncio.Task] = set()
 
 
 @app.get("/")
@@ -111,7 +137,7 @@ async def health_check():
     return {
         "status": "healthy",
         "quiz_agent_initialized": quiz_agent is not None,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
 
@@ -126,7 +152,8 @@ async def handle_quiz(request: QuizRequest):
     """
     try:
         # Validate secret
-        if request.secret != EXPECTED_SECRET:
+        secret_hash = hashlib.sha256(request.secret.encode()).digest()
+        if not hmac.compare_digest(secret_hash, _EXPECTED_SECRET_HASH):
             logger.warning(f"Invalid secret attempt from {request.email}")
             raise HTTPException(
                 status_code=403,
@@ -146,20 +173,30 @@ async def handle_quiz(request: QuizRequest):
                 detail="Quiz agent not initialized"
             )
 
-        # Start async quiz solving (fire and forget)
-        asyncio.create_task(
+        # Reject instead of queueing when all slots are taken
+        if len(_BG_TASKS) >= MAX_CONCURRENT_QUIZZES:
+            logger.warning(f"Rejecting quiz request: {len(_BG_TASKS)} quizzes already running")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many quizzes in progress. Try again later."
+            )
+
+        # Start async quiz solving in the background
+        task = asyncio.create_task(
             quiz_agent.solve_quiz_chain(
                 email=request.email,
                 secret=request.secret,
                 start_url=request.url
             )
         )
+        _BG_TASKS.add(task)
+        task.add_done_callback(_BG_TASKS.discard)
 
         # Return immediate response
         return QuizResponse(
             status="accepted",
             message="Quiz solving process started",
-            started_at=datetime.utcnow().isoformat(),
+            started_at=datetime.now(timezone.utc).isoformat(),
             email=request.email
         )
 
@@ -177,7 +214,7 @@ async def handle_quiz(request: QuizRequest):
 async def value_error_handler(request: Request, exc: ValueError):
     """Handle validation errors"""
     logger.error(f"Validation error: {str(exc)}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=400,
         content={"detail": str(exc)}
     )
@@ -187,7 +224,7 @@ async def value_error_handler(request: Request, exc: ValueError):
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle unexpected errors"""
     logger.error(f"Unexpected error: {str(exc)}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
@@ -202,10 +239,14 @@ if __name__ == "__main__":
 
     logger.info(f"Starting server on {host}:{port}")
 
+    # Pin the C-backed event loop and HTTP parser from uvicorn[standard]
+    # (uvloop has no Windows build, so fall back to asyncio there)
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
-        reload=True,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        reload=False,
         log_level="info"
     )
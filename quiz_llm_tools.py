@@ -3,59 +3,277 @@ Custom LangChain tools for quiz solving
 Includes tools for web scraping, data extraction, analysis, and submission
 """
 import os
+import ast
 import base64
 import json
 import logging
 import math
-from typing import Dict, Any, Optional, Union
+import numbers
+import re
+import functools
+import threading
+import importlib.util
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Union
 from io import BytesIO, StringIO
 import asyncio
 
+import aiofiles
 import httpx
-import pandas as pd
-from bs4 import BeautifulSoup
-from PyPDF2 import PdfReader
+import orjson
+from cachetools import LRUCache, TTLCache
+from selectolax.lexbor import LexborHTMLParser
 from langchain_core.tools import tool
 
-# Optional imports with graceful fallback
-try:
-    from playwright.sync_api import sync_playwright
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
+if TYPE_CHECKING:
+    import polars as pl
 
-try:
+# Optional dependencies are only located here; like the other heavy
+# libraries they are imported on first use (see Lazy Imports below)
+PLAYWRIGHT_AVAILABLE = importlib.util.find_spec("playwright") is not None
+MATPLOTLIB_AVAILABLE = importlib.util.find_spec("matplotlib") is not None
+
+logger = logging.getLogger(__name__)
+
+# Shared HTTP client so tools reuse pooled (and HTTP/2 multiplexed) connections
+# instead of paying a TCP/TLS handshake on every call. Compressed responses
+# (brotli/zstd via the httpx extras) are decoded transparently
+_HTTP = httpx.AsyncClient(
+    follow_redirects=True,
+    headers={"Accept-Encoding": "br, gzip, zstd"},
+    timeout=httpx.Timeout(30.0),
+    limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+    http2=True
+)
+
+# Parsed page text by URL. Entries expire quickly; the validators outlive them
+# (on disk when PAGE_CACHE_DIR is set, see _page_validators) so an expired
+# page can be revalidated with a conditional GET (304)
+_PAGE_CACHE = TTLCache(maxsize=256, ttl=60)
+_PAGE_CACHE_SIZE_LIMIT = 64 * 1024 * 1024  # bytes, on-disk validator store
+_PAGE_LOCKS = LRUCache(maxsize=256)  # url -> asyncio.Lock
+
+# Elements whose content is never visible page text; dropped before extraction
+_NON_CONTENT_TAGS = ["script", "style", "noscript", "svg", "template"]
+
+# Response charsets that can be passed to the HTML parser undecoded
+_UTF8_CHARSETS = ('utf-8', 'utf8')
+
+# Known prompt-injection phrases, matched in a single pass over untrusted content
+_INJECTION_RE = re.compile(
+    r"(?:ignore|disregard|forget) (?:all )?(?:the )?(?:previous|prior|above) instructions"
+    r"|you are now"
+    r"|forget your role"
+    r"|new instructions:"
+    r"|(?:reveal|print|show) (?:me )?(?:the |your )?(?:secret|code word|system prompt)"
+    r"|(?:i am|i'm) (?:the |your )?(?:system )?admin",
+    re.IGNORECASE
+)
+
+# Long-lived headless browser, started lazily on first JavaScript scrape and
+# replaced after a number of contexts to cap Chromium's memory growth
+_PW = None
+_BROWSER = None
+_BROWSER_LOCK = asyncio.Lock()
+_BROWSER_CONTEXTS = 0
+_BROWSER_RECYCLE_AFTER = 100
+_BROWSER_ARGS = ["--disable-dev-shm-usage", "--no-sandbox"]
+# Upper bound on pages rendered at once by scrape_many_tool
+_SCRAPE_CONCURRENCY = 4
+
+
+# ============================================================================
+# Lazy Imports
+# ============================================================================
+# Heavy libraries are imported by the first tool that needs them, so startup
+# and the HTTP-only tools don't pay for NumPy, pandas, Polars, PDFium,
+# matplotlib or Playwright
+
+@functools.cache
+def _np():
+    import numpy
+    return numpy
+
+
+@functools.cache
+def _pd():
+    import pandas
+    return pandas
+
+
+@functools.cache
+def _pl():
+    import polars
+    return polars
+
+
+@functools.cache
+def _pdfium():
+    import pypdfium2
+    return pypdfium2
+
+
+@functools.cache
+def _playwright():
+    import playwright.async_api
+    return playwright.async_api
+
+
+@functools.cache
+def _plt():
+    """Import pyplot on the Agg backend, with the font cache and renderer warmed up"""
     import matplotlib
     matplotlib.use('Agg')  # Non-GUI backend
     import matplotlib.pyplot as plt
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
 
-logger = logging.getLogger(__name__)
+    # Draw a throwaway figure so the first real chart doesn't pay for
+    # font loading and renderer setup
+    warmup_fig = plt.figure()
+    warmup_fig.text(0.5, 0.5, "warmup")
+    warmup_fig.canvas.draw()
+    plt.close(warmup_fig)
+
+    return plt
 
 
 # ============================================================================
 # Helper Functions
 # ============================================================================
 
-def _extract_clean_text(soup: BeautifulSoup) -> str:
+@functools.cache
+def _page_validators():
     """
-    Extract clean text from a BeautifulSoup object.
-    Removes scripts, styles, and normalizes whitespace.
+    Store of url -> (text, etag, last_modified) for conditional GETs.
+    Backed by an on-disk LRU cache when PAGE_CACHE_DIR is set, so pages stay
+    revalidatable across restarts; otherwise an in-process LRU cache.
+    """
+    cache_dir = os.getenv("PAGE_CACHE_DIR")
+    if cache_dir:
+        import diskcache
+        return diskcache.Cache(
+            cache_dir,
+            size_limit=_PAGE_CACHE_SIZE_LIMIT,
+            eviction_policy="least-recently-used"
+        )
+    return LRUCache(maxsize=256)
+
+
+async def _page_validator_store():
+    """Return the validator store; the first call may open SQLite, so it runs in a thread"""
+    if _page_validators.cache_info().currsize == 0:
+        return await asyncio.to_thread(_page_validators)
+    return _page_validators()
+
+
+async def _get_page_validators(url: str):
+    """Look up (text, etag, last_modified) for a URL without blocking the event loop"""
+    store = await _page_validator_store()
+    if isinstance(store, LRUCache):
+        return store.get(url)
+    # diskcache does synchronous SQLite reads and unpickling
+    return await asyncio.to_thread(store.get, url)
+
+
+async def _set_page_validators(url: str, validators: tuple):
+    """Store (text, etag, last_modified) for a URL without blocking the event loop"""
+    store = await _page_validator_store()
+    if isinstance(store, LRUCache):
+        store[url] = validators
+    else:
+        await asyncio.to_thread(store.set, url, validators)
+
+
+async def close_http_client():
+    """Close the shared HTTP client and its pooled connections"""
+    await _HTTP.aclose()
+
+
+async def _ensure_browser():
+    """Launch or recycle the shared browser. Caller must hold _BROWSER_LOCK."""
+    global _PW, _BROWSER, _BROWSER_CONTEXTS
+
+    # Only recycle when no scrape is still using the browser
+    if (_BROWSER is not None and _BROWSER_CONTEXTS >= _BROWSER_RECYCLE_AFTER
+            and not _BROWSER.contexts):
+        logger.info(f"Recycling Chromium browser after {_BROWSER_CONTEXTS} contexts")
+        await _BROWSER.close()
+        _BROWSER = None
+
+    if _BROWSER is None or not _BROWSER.is_connected():
+        if _PW is None:
+            _PW = await _playwright().async_playwright().start()
+        _BROWSER = await _PW.chromium.launch(headless=True, args=_BROWSER_ARGS)
+        _BROWSER_CONTEXTS = 0
+        logger.info("Launched shared Chromium browser")
+
+    return _BROWSER
+
+
+async def _get_browser():
+    """Return the shared Chromium browser, launching it on first use"""
+    async with _BROWSER_LOCK:
+        return await _ensure_browser()
+
+
+async def _new_context():
+    """Open a fresh browser context (isolated cookies/storage) on the shared browser"""
+    global _BROWSER_CONTEXTS
+    async with _BROWSER_LOCK:
+        browser = await _ensure_browser()
+        context = await browser.new_context()
+        _BROWSER_CONTEXTS += 1
+    return context
+
+
+async def start_browser():
+    """Launch the shared browser ahead of the first JavaScript scrape"""
+    if PLAYWRIGHT_AVAILABLE:
+        await _get_browser()
+
+
+async def close_browser():
+    """Close the shared browser and stop Playwright if they were started"""
+    global _PW, _BROWSER
+    if _BROWSER is not None:
+        await _BROWSER.close()
+        _BROWSER = None
+    if _PW is not None:
+        await _PW.stop()
+        _PW = None
+
+
+def _flag_prompt_injection(text: str, source: str):
+    """
+    Log a warning if untrusted content contains a known prompt-injection phrase.
+    The content itself is returned to the agent unchanged.
 
     Args:
-        soup: BeautifulSoup object
+        text: Untrusted text (web page, PDF, etc.)
+        source: Where the text came from, for the log message
+    """
+    match = _INJECTION_RE.search(text)
+    if match:
+        logger.warning(f"Possible prompt injection in {source}: {match.group(0)!r}")
+
+
+def _extract_clean_text(html: Union[str, bytes]) -> str:
+    """
+    Extract clean text from an HTML document.
+    Removes scripts, styles and other non-content elements, and normalizes whitespace.
+
+    Args:
+        html: Raw HTML content (str, or UTF-8 encoded bytes)
 
     Returns:
         Clean text content
     """
-    # Remove script and style elements
-    for script in soup(["script", "style"]):
-        script.decompose()
+    tree = LexborHTMLParser(html)
+
+    # Remove non-content elements before walking the tree for text
+    tree.strip_tags(_NON_CONTENT_TAGS)
 
     # Get text content
-    text = soup.get_text()
+    root = tree.body if tree.body is not None else tree.root
+    text = root.text(separator="\n") if root is not None else ""
 
     # Clean up whitespace
     lines = (line.strip() for line in text.splitlines())
@@ -70,7 +288,7 @@ def _extract_clean_text(soup: BeautifulSoup) -> str:
 # ============================================================================
 
 @tool
-def fetch_webpage_tool(url: str) -> str:
+async def fetch_webpage_tool(url: str) -> str:
     """
     Fetch a webpage and return its HTML content.
     Use this for static HTML pages that don't require JavaScript execution.
@@ -82,13 +300,54 @@ def fetch_webpage_tool(url: str) -> str:
         HTML content as string
     """
     try:
-        logger.info(f"Fetching webpage: {url}")
-        response = httpx.get(url, timeout=30.0, follow_redirects=True)
-        response.raise_for_status()
-
-        # Parse with BeautifulSoup and extract clean text
-        soup = BeautifulSoup(response.text, 'html.parser')
-        text = _extract_clean_text(soup)
+        cached = _PAGE_CACHE.get(url)
+        if cached is not None:
+            logger.info(f"Serving cached webpage: {url}")
+            return cached
+
+        # Single-flight: concurrent calls for the same URL share one fetch
+        lock = _PAGE_LOCKS.setdefault(url, asyncio.Lock())
+        async with lock:
+            cached = _PAGE_CACHE.get(url)
+            if cached is not None:
+                logger.info(f"Serving cached webpage: {url}")
+                return cached
+
+            logger.info(f"Fetching webpage: {url}")
+
+            # Revalidate a previously seen page instead of downloading it again
+            headers = {}
+            previous = await _get_page_validators(url)
+            if previous:
+                _, etag, last_modified = previous
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+
+            response = await _HTTP.get(url, headers=headers)
+
+            if response.status_code == 304 and previous:
+                logger.info(f"Webpage not modified, reusing parsed text: {url}")
+                text = previous[0]
+            else:
+                response.raise_for_status()
+
+                # Hand UTF-8 bodies to the parser as raw bytes; lexbor works on
+                # UTF-8 natively, which skips decoding to str and re-encoding
+                charset = (response.charset_encoding or 'utf-8').lower()
+                html = response.content if charset in _UTF8_CHARSETS else response.text
+
+                # Parse and extract clean text
+                text = _extract_clean_text(html)
+                _flag_prompt_injection(text, url)
+
+                etag = response.headers.get('etag')
+                last_modified = response.headers.get('last-modified')
+                if etag or last_modified:
+                    await _set_page_validators(url, (text, etag, last_modified))
+
+            _PAGE_CACHE[url] = text
 
         logger.info(f"Successfully fetched {len(text)} characters from {url}")
         return text
@@ -98,8 +357,36 @@ def fetch_webpage_tool(url: str) -> str:
         return f"Error fetching webpage: {str(e)}"
 
 
+async def _render_page(url: str) -> str:
+    """Render a page in a fresh context on the shared browser and return its clean text"""
+    # Fresh context per call so cookies/storage don't leak between scrapes
+    context = await _new_context()
+    try:
+        page = await context.new_page()
+
+        # Navigate and wait for the DOM (inline scripts have run by then)
+        await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+
+        # Give late fetch/XHR rendering a short window to settle; pages with
+        # ads or polling never go idle, so don't wait the full timeout
+        try:
+            await page.wait_for_load_state("networkidle", timeout=5000)
+        except _playwright().TimeoutError:
+            pass
+
+        # Get the rendered HTML content
+        content = await page.content()
+    finally:
+        await context.close()
+
+    # Parse and extract clean text
+    text = _extract_clean_text(content)
+    _flag_prompt_injection(text, url)
+    return text
+
+
 @tool
-def scrape_with_javascript_tool(url: str) -> str:
+async def scrape_with_javascript_tool(url: str) -> str:
     """
     Fetch and render a webpage with JavaScript execution using Playwright.
     Use this when the page requires DOM execution or JavaScript rendering.
@@ -115,36 +402,49 @@ def scrape_with_javascript_tool(url: str) -> str:
 
     try:
         logger.info(f"Scraping with JavaScript: {url}")
+        text = await _render_page(url)
+        logger.info(f"Successfully scraped {len(text)} characters from {url}")
+        return text
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
+    except Exception as e:
+        logger.error(f"Error scraping with JavaScript {url}: {str(e)}")
+        return f"Error scraping with JavaScript: {str(e)}"
 
-            # Navigate and wait for page to load
-            page.goto(url, wait_until="networkidle", timeout=30000)
 
-            # Wait for dynamic content
-            page.wait_for_timeout(2000)
+@tool
+async def scrape_many_tool(urls: List[str]) -> Dict[str, str]:
+    """
+    Render and scrape several JavaScript-heavy webpages concurrently using Playwright.
+    Use this instead of repeated scrape_with_javascript_tool calls when several pages are needed.
 
-            # Get the rendered HTML content
-            content = page.content()
+    Args:
+        urls: The URLs to scrape
 
-            browser.close()
+    Returns:
+        Dictionary mapping each URL to its rendered text (or an error message)
+    """
+    if not PLAYWRIGHT_AVAILABLE:
+        return {url: "Error: Playwright is not installed. Run: pip install playwright && playwright install chromium"
+                for url in urls}
 
-        # Parse with BeautifulSoup and extract clean text
-        soup = BeautifulSoup(content, 'html.parser')
-        text = _extract_clean_text(soup)
+    logger.info(f"Scraping {len(urls)} pages with JavaScript")
+    semaphore = asyncio.Semaphore(_SCRAPE_CONCURRENCY)
 
-        logger.info(f"Successfully scraped {len(text)} characters from {url}")
-        return text
+    async def scrape(url: str) -> str:
+        async with semaphore:
+            try:
+                return await _render_page(url)
+            except Exception as e:
+                logger.error(f"Error scraping with JavaScript {url}: {str(e)}")
+                return f"Error scraping with JavaScript: {str(e)}"
 
-    except Exception as e:
-        logger.error(f"Error scraping with JavaScript {url}: {str(e)}")
-        return f"Error scraping with JavaScript: {str(e)}"
+    # Navigations are pure I/O waits, so overlap them on the shared browser
+    texts = await asyncio.gather(*(scrape(url) for url in urls))
+    return dict(zip(urls, texts))
 
 
 @tool
-def download_file_tool(url: str) -> str:
+async def download_file_tool(url: str) -> str:
     """
     Download a file from a URL and save it locally.
     Returns the local file path.
@@ -158,24 +458,36 @@ def download_file_tool(url: str) -> str:
     try:
         logger.info(f"Downloading file from: {url}")
 
-        response = httpx.get(url, timeout=60.0, follow_redirects=True)
-        response.raise_for_status()
-
-        # Determine filename from URL or Content-Disposition header
-        filename = url.split('/')[-1].split('?')[0]
-        if 'content-disposition' in response.headers:
-            content_disp = response.headers['content-disposition']
-            if 'filename=' in content_disp:
-                filename = content_disp.split('filename=')[1].strip('"')
-
-        # Save to downloads directory
-        downloads_dir = os.path.join(os.getcwd(), 'downloads')
-        os.makedirs(downloads_dir, exist_ok=True)
-
-        file_path = os.path.join(downloads_dir, filename)
-
-        with open(file_path, 'wb') as f:
-            f.write(response.content)
+        # Stream the body to disk in chunks instead of buffering it in memory
+        async with _HTTP.stream("GET", url, timeout=60.0) as response:
+            response.raise_for_status()
+
+            # Determine filename from URL or Content-Disposition header
+            filename = url.split('/')[-1].split('?')[0]
+            if 'content-disposition' in response.headers:
+                content_disp = response.headers['content-disposition']
+                if 'filename=' in content_disp:
+                    filename = content_disp.split('filename=')[1].strip('"')
+
+            # Save to downloads directory
+            downloads_dir = os.path.join(os.getcwd(), 'downloads')
+            os.makedirs(downloads_dir, exist_ok=True)
+
+            file_path = os.path.join(downloads_dir, filename)
+
+            # Write to a temporary name and move it into place once complete,
+            # so an interrupted transfer never leaves a truncated file behind
+            partial_path = file_path + '.part'
+            try:
+                async with aiofiles.open(partial_path, 'wb') as f:
+                    async for chunk in response.aiter_bytes(65536):
+                        await f.write(chunk)
+            except BaseException:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                raise
+
+            os.replace(partial_path, file_path)
 
         logger.info(f"File downloaded successfully to: {file_path}")
         return file_path
@@ -189,8 +501,65 @@ def download_file_tool(url: str) -> str:
 # Data Extraction Tools
 # ============================================================================
 
+# PDFium is not thread-safe, so documents are processed one at a time
+_PDFIUM_LOCK = threading.Lock()
+
+
+def _extract_pdf_text(file_path: str) -> str:
+    """
+    Extract text from every page of a PDF file.
+    Blocking; called from a worker thread by extract_data_from_pdf_tool.
+
+    Args:
+        file_path: Path to the PDF file
+
+    Returns:
+        Extracted text content from all pages
+    """
+    with _PDFIUM_LOCK:
+        pdf = _pdfium().PdfDocument(file_path)
+        try:
+            num_pages = len(pdf)
+
+            parts = [f"PDF has {num_pages} pages\n\n"]
+
+            for i, page in enumerate(pdf, 1):
+                textpage = page.get_textpage()
+                text = textpage.get_text_range()
+
+                # Free native page memory as soon as its text is extracted
+                textpage.close()
+                page.close()
+
+                parts.append(f"=== Page {i} ===\n{text}\n\n")
+        finally:
+            pdf.close()
+
+    return "".join(parts)
+
+
+def _extract_pdf_texts(file_paths: List[str]) -> Dict[str, Union[str, Exception]]:
+    """
+    Extract text from several PDF files, one after another.
+    Blocking; called from a worker thread by extract_data_from_pdfs_tool.
+
+    Args:
+        file_paths: Paths to the PDF files
+
+    Returns:
+        Dictionary mapping each file path to its text, or the exception it raised
+    """
+    results = {}
+    for path in file_paths:
+        try:
+            results[path] = _extract_pdf_text(path)
+        except Exception as e:
+            results[path] = e
+    return results
+
+
 @tool
-def extract_data_from_pdf_tool(file_path: str) -> str:
+async def extract_data_from_pdf_tool(file_path: str) -> str:
     """
     Extract text and tables from a PDF file.
 
@@ -203,14 +572,8 @@ def extract_data_from_pdf_tool(file_path: str) -> str:
     try:
         logger.info(f"Extracting data from PDF: {file_path}")
 
-        reader = PdfReader(file_path)
-        num_pages = len(reader.pages)
-
-        extracted_text = f"PDF has {num_pages} pages\n\n"
-
-        for i, page in enumerate(reader.pages, 1):
-            text = page.extract_text()
-            extracted_text += f"=== Page {i} ===\n{text}\n\n"
+        extracted_text = await asyncio.to_thread(_extract_pdf_text, file_path)
+        _flag_prompt_injection(extracted_text, file_path)
 
         logger.info(f"Successfully extracted {len(extracted_text)} characters from PDF")
         return extracted_text
@@ -220,10 +583,194 @@ def extract_data_from_pdf_tool(file_path: str) -> str:
         return f"Error extracting PDF data: {str(e)}"
 
 
+@tool
+async def extract_data_from_pdfs_tool(file_paths: List[str]) -> Dict[str, str]:
+    """
+    Extract text from several PDF files in one call.
+    Use this instead of repeated extract_data_from_pdf_tool calls when several PDFs are needed.
+
+    Args:
+        file_paths: Paths to the PDF files
+
+    Returns:
+        Dictionary mapping each file path to its extracted text (or an error message)
+    """
+    logger.info(f"Extracting data from {len(file_paths)} PDFs")
+
+    # PDFium is serialized by _PDFIUM_LOCK and extraction takes milliseconds
+    # per page, so one worker thread handles the whole batch
+    results = await asyncio.to_thread(_extract_pdf_texts, file_paths)
+
+    extracted = {}
+    for path, result in results.items():
+        if isinstance(result, Exception):
+            logger.error(f"Error extracting data from PDF {path}: {str(result)}")
+            extracted[path] = f"Error extracting PDF data: {str(result)}"
+        else:
+            _flag_prompt_injection(result, path)
+            extracted[path] = result
+
+    logger.info(f"Extracted text from {len(file_paths)} PDFs")
+    return extracted
+
+
 # ============================================================================
 # Data Analysis Tools
 # ============================================================================
 
+# Inputs at least this long are never treated as file paths (PATH_MAX on Linux)
+_MAX_PATH_LENGTH = 4096
+
+# File types analyze_data_tool can load from a path
+_DATA_FILE_SUFFIXES = ('.csv', '.json', '.xls', '.xlsx')
+
+# Column type names accepted in analyze_data_tool's 'dtypes' parameter,
+# mapped to Polars dtype names
+_POLARS_DTYPES = {
+    'int': 'Int64', 'int64': 'Int64',
+    'float': 'Float64', 'float64': 'Float64',
+    'str': 'String', 'string': 'String',
+    'bool': 'Boolean', 'boolean': 'Boolean',
+    'date': 'Date', 'datetime': 'Datetime',
+}
+
+# The same types as pandas read_csv dtypes, for the pandas fallback parser;
+# Date/Datetime columns are parsed with parse_dates instead
+_PANDAS_DTYPES = {
+    'Int64': 'Int64', 'Float64': 'float64', 'String': 'string', 'Boolean': 'boolean',
+}
+
+
+def _dtype_names(dtypes: Dict[str, str]) -> Dict[str, str]:
+    """
+    Resolve a column -> type name mapping to Polars dtype names.
+
+    Raises:
+        ValueError: If a type name isn't one of _POLARS_DTYPES
+    """
+    resolved = {}
+    for col, dtype in dtypes.items():
+        name = _POLARS_DTYPES.get(str(dtype).lower())
+        if name is None:
+            accepted = ", ".join(sorted(_POLARS_DTYPES))
+            raise ValueError(f"Unsupported type '{dtype}' for column '{col}'; accepted types: {accepted}")
+        resolved[col] = name
+    return resolved
+
+
+def _schema_overrides(dtypes: Optional[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+    """Translate a column -> type name mapping into Polars schema overrides"""
+    if not dtypes:
+        return None
+    pl = _pl()
+    return {col: getattr(pl, name) for col, name in _dtype_names(dtypes).items()}
+
+
+def _read_csv(data_input: str, is_path: bool, dtypes: Optional[Dict[str, str]] = None) -> "pl.DataFrame":
+    """
+    Read CSV data with Polars' multi-threaded parser.
+    Falls back to pandas' Python engine (with delimiter sniffing) for
+    irregular CSVs that Polars rejects.
+
+    Args:
+        data_input: File path or CSV text
+        is_path: Whether data_input is a file path
+        dtypes: Optional column -> type name mapping, skips type inference
+
+    Returns:
+        Parsed DataFrame
+    """
+    pl = _pl()
+
+    try:
+        source = data_input if is_path else StringIO(data_input)
+        return pl.read_csv(source, schema_overrides=_schema_overrides(dtypes))
+    except pl.exceptions.ComputeError as e:
+        logger.warning(f"Polars could not parse CSV, retrying with pandas' Python engine: {str(e)}")
+        source = data_input if is_path else StringIO(data_input)
+        return _read_csv_pandas(source, dtypes)
+
+
+def _read_csv_pandas(source: Union[str, StringIO], dtypes: Optional[Dict[str, str]] = None) -> "pl.DataFrame":
+    """
+    Read CSV data with pandas' Python engine (with delimiter sniffing),
+    applying the caller's column types, and convert it to Polars.
+    """
+    pl = _pl()
+    names = _dtype_names(dtypes) if dtypes else {}
+    pandas_dtypes = {col: _PANDAS_DTYPES[name] for col, name in names.items() if name in _PANDAS_DTYPES}
+    date_cols = [col for col, name in names.items() if name in ('Date', 'Datetime')]
+
+    df = pl.from_pandas(_pd().read_csv(
+        source, engine='python', sep=None,
+        dtype=pandas_dtypes or None, parse_dates=date_cols or False
+    ))
+
+    # pandas parses dates as datetimes; narrow the ones requested as dates
+    date_only = [col for col, name in names.items() if name == 'Date']
+    if date_only:
+        df = df.with_columns(pl.col(date_only).cast(pl.Date))
+    return df
+
+
+def _read_json(text: Union[str, bytes]) -> "pl.DataFrame":
+    """
+    Read JSON data into a DataFrame.
+    Record lists and dicts of column lists load directly into Polars. The
+    column-oriented dict-of-dicts shape written by pandas' DataFrame.to_json()
+    would become struct columns there, so it goes through pandas' reader,
+    as create_visualization_tool does.
+
+    Args:
+        text: JSON text or bytes
+
+    Returns:
+        Parsed DataFrame
+    """
+    pl = _pl()
+    data = json.loads(text)
+    if isinstance(data, dict) and data and all(isinstance(value, dict) for value in data.values()):
+        source = StringIO(text) if isinstance(text, str) else BytesIO(text)
+        return pl.from_pandas(_pd().read_json(source))
+    return pl.DataFrame(data)
+
+
+def _scan_csv_aggregate(
+    path: str,
+    operation: str,
+    column: Optional[str],
+    dtypes: Optional[Dict[str, str]] = None
+) -> Union[int, float]:
+    """
+    Compute sum/mean/count over a CSV file without loading it into memory.
+    The lazy scan only parses the requested column and the streaming engine
+    processes the file in batches.
+
+    Args:
+        path: CSV file path
+        operation: 'sum', 'mean' or 'count'
+        column: Column to aggregate (not needed for 'count')
+        dtypes: Optional column -> type name mapping
+
+    Returns:
+        Aggregated value
+    """
+    pl = _pl()
+    lf = pl.scan_csv(path, schema_overrides=_schema_overrides(dtypes))
+
+    if operation == 'count':
+        expr = pl.len()
+    else:
+        expr = getattr(pl.col(column), operation)()
+
+    return lf.select(expr).collect(engine="streaming").item()
+
+
+def _frame_to_text(df: "pl.DataFrame") -> str:
+    """Render a Polars DataFrame as a plain-text table without truncation"""
+    return df.to_pandas().to_string(index=False)
+
+
 @tool
 def analyze_data_tool(data_description: str) -> str:
     """
@@ -236,66 +783,95 @@ def analyze_data_tool(data_description: str) -> str:
             - operation: Type of analysis (sum, mean, count, filter, sort, etc.)
             - column: Column name for operation (if applicable)
             - condition: Filter condition (if applicable)
+            - dtypes: Optional column types for CSV data, e.g. {"price": "float"}
+              (int, float, str, bool, date, datetime)
 
     Returns:
         Result of the analysis as string
     """
     try:
         logger.info("Analyzing data")
+        pl = _pl()
 
-        # Parse the input
+        # Parse the input. Data that carries numbers goes through stdlib json:
+        # orjson silently turns integers wider than 64 bits into floats
         params = json.loads(data_description)
         data_input = params.get('data', '')
         operation = params.get('operation', 'describe')
         column = params.get('column')
         condition = params.get('condition')
+        dtypes = params.get('dtypes')
+
+        # Detect the data format: inline JSON by its first character, then
+        # file paths (only short inputs can be paths, so large inline CSV
+        # never costs a stat call), otherwise inline CSV
+        is_json = data_input.lstrip()[:1] in ('[', '{')
+        is_file = (not is_json and len(data_input) < _MAX_PATH_LENGTH
+                   and os.path.isfile(data_input))
+
+        # Simple aggregates over a CSV file are streamed instead of loading
+        # the whole file; anything Polars can't scan falls through to a full load
+        if (operation == 'count' or (operation in ('sum', 'mean') and column)) \
+                and is_file and data_input.endswith('.csv'):
+            try:
+                result = _scan_csv_aggregate(data_input, operation, column, dtypes)
+                logger.info(f"Analysis completed: {operation} (streamed)")
+                return str(result)
+            except pl.exceptions.PolarsError as e:
+                logger.warning(f"Streaming {operation} failed, loading full file: {str(e)}")
 
         # Load data into DataFrame
         df = None
 
-        # Try to detect data format
-        if data_input.endswith('.csv') or os.path.isfile(data_input):
+        if is_json:
+            # JSON string (list of records or dict of columns)
+            df = _read_json(data_input)
+        elif is_file:
             # File path
             if data_input.endswith('.csv'):
-                df = pd.read_csv(data_input)
+                df = _read_csv(data_input, is_path=True, dtypes=dtypes)
             elif data_input.endswith('.json'):
-                df = pd.read_json(data_input)
+                with open(data_input, 'rb') as f:
+                    df = _read_json(f.read())
             elif data_input.endswith(('.xls', '.xlsx')):
-                df = pd.read_excel(data_input)
-        elif data_input.startswith('[') or data_input.startswith('{'):
-            # JSON string
-            df = pd.read_json(BytesIO(data_input.encode()))
+                df = pl.from_pandas(_pd().read_excel(data_input))
+        elif (len(data_input) < _MAX_PATH_LENGTH and '\n' not in data_input
+                and data_input.rstrip().lower().endswith(_DATA_FILE_SUFFIXES)):
+            # Looks like a path to a data file that isn't there; say so rather
+            # than parsing the path itself as a header-only CSV
+            return f"Error: File not found: {data_input}"
         else:
             # Try CSV string
-            df = pd.read_csv(StringIO(data_input))
+            df = _read_csv(data_input, is_path=False, dtypes=dtypes)
 
-        if df is None or df.empty:
+        if df is None or df.is_empty():
             return "Error: Could not load data"
 
         # Perform requested operation
         result = None
 
         if operation == 'sum' and column:
-            result = df[column].sum()
+            result = df.get_column(column).sum()
         elif operation == 'mean' and column:
-            result = df[column].mean()
+            result = df.get_column(column).mean()
         elif operation == 'count':
-            result = len(df)
+            result = df.height
         elif operation == 'describe':
-            result = df.describe().to_string()
+            result = _frame_to_text(df.describe())
         elif operation == 'columns':
-            result = df.columns.tolist()
+            result = df.columns
         elif operation == 'head':
-            result = df.head(10).to_string()
+            result = _frame_to_text(df.head(10))
         elif operation == 'filter' and condition:
-            # Simple filtering (this is basic, can be enhanced)
-            filtered_df = df.query(condition)
+            # Conditions use pandas query syntax, so filter on the pandas view
+            filtered_df = df.to_pandas().query(condition)
             result = filtered_df.to_string()
         elif operation == 'aggregate':
-            # Custom aggregation
-            result = df.agg(params.get('agg_func', 'sum')).to_string()
+            # Custom aggregation over the numeric columns (sum, mean, min, max, ...)
+            agg_func = params.get('agg_func', 'sum')
+            result = _frame_to_text(df.select(getattr(pl.selectors.numeric(), agg_func)()))
         else:
-            result = f"Data shape: {df.shape}\nColumns: {df.columns.tolist()}\n\n{df.head().to_string()}"
+            result = f"Data shape: {df.shape}\nColumns: {df.columns}\n\n{_frame_to_text(df.head())}"
 
         logger.info(f"Analysis completed: {operation}")
         return str(result)
@@ -305,13 +881,230 @@ def analyze_data_tool(data_description: str) -> str:
         return f"Error analyzing data: {str(e)}"
 
 
+# NumPy statistics exposed to execute_calculation_tool. Exact-integer
+# reductions (sum, prod) stay on Python ints to avoid int64 overflow.
+_NUMPY_FUNCS = ('mean', 'median', 'average', 'std', 'var', 'percentile', 'cumsum')
+
+# Best-effort size limits for values built by execute_calculation_tool
+# expressions. Big integer and sequence operations hold the GIL, so something
+# like 10**10**10 or 'a'*10**10 would otherwise stall the whole event loop.
+# These catch the common blow-ups; they are not a wall-clock limit, and
+# e.g. nested comprehensions over large lists can still run for a long time
+_MAX_INT_BITS = 1_000_000
+_MAX_SEQUENCE_LENGTH = 1_000_000
+_MAX_FACTORIAL_ARG = 50_000
+_SEQUENCE_TYPES = (str, bytes, list, tuple)
+
+
+def _check_int_bits(bits: int):
+    if bits > _MAX_INT_BITS:
+        raise ValueError(f"Result too large (over {_MAX_INT_BITS} bits)")
+
+
+def _check_sequence_length(length: int):
+    if length > _MAX_SEQUENCE_LENGTH:
+        raise ValueError(f"Result too large (over {_MAX_SEQUENCE_LENGTH} items)")
+
+
+def _guarded_pow(base, exp):
+    """** that refuses integer results over _MAX_INT_BITS"""
+    if isinstance(base, int) and isinstance(exp, int) and exp > 0 and abs(base) > 1:
+        # Upper bound on the result's bit length: |base| < 2**bit_length
+        _check_int_bits((abs(base).bit_length() - 1) * exp + 1)
+    return base ** exp
+
+
+def _guarded_mul(left, right):
+    """* that refuses oversized integers and sequence repetitions"""
+    if isinstance(left, int) and isinstance(right, int):
+        _check_int_bits(left.bit_length() + right.bit_length())
+    elif isinstance(left, _SEQUENCE_TYPES) and isinstance(right, int):
+        _check_sequence_length(len(left) * right)
+    elif isinstance(right, _SEQUENCE_TYPES) and isinstance(left, int):
+        _check_sequence_length(len(right) * left)
+    return left * right
+
+
+def _guarded_lshift(left, right):
+    """<< that refuses integer results over _MAX_INT_BITS"""
+    if isinstance(left, int) and isinstance(right, int) and right > 0:
+        _check_int_bits(left.bit_length() + right)
+    return left << right
+
+
+def _check_int_args_bits(name: str, values):
+    """gcd/lcm cost (and lcm's result) is bounded by the inputs' total size"""
+    if sum(abs(value).bit_length() for value in values if isinstance(value, int)) > _MAX_INT_BITS:
+        raise ValueError(f"{name}() arguments too large (over {_MAX_INT_BITS} bits in total)")
+
+
+def _guarded_prod(iterable, *, start=1):
+    """math.prod with every partial product checked like *"""
+    result = start
+    for item in iterable:
+        result = _guarded_mul(result, item)
+    return result
+
+
+def _guarded_lcm(*integers):
+    _check_int_args_bits('lcm', integers)
+    return math.lcm(*integers)
+
+
+def _guarded_gcd(*integers):
+    _check_int_args_bits('gcd', integers)
+    return math.gcd(*integers)
+
+
+def _guarded_sum(iterable, start=0):
+    """sum() for numbers only; a list or str start makes it quadratic"""
+    if not isinstance(start, numbers.Number):
+        raise ValueError("sum() start value must be a number")
+    return sum(iterable, start)
+
+
+def _check_factorial_arg(name: str, n):
+    if isinstance(n, int) and n > _MAX_FACTORIAL_ARG:
+        raise ValueError(f"{name}() argument too large (over {_MAX_FACTORIAL_ARG})")
+
+
+def _guarded_factorial(n):
+    _check_factorial_arg('factorial', n)
+    return math.factorial(n)
+
+
+def _guarded_comb(n, k):
+    # Cost grows with the smaller of k and n - k
+    if isinstance(n, int) and isinstance(k, int):
+        _check_factorial_arg('comb', min(k, n - k))
+    return math.comb(n, k)
+
+
+def _guarded_perm(n, k=None):
+    _check_factorial_arg('perm', n if k is None else k)
+    return math.perm(n, k)
+
+
+# Operators routed through the guards above; _compile_expression rewrites
+# them into calls to these (underscore) names, which expressions can't spell
+_GUARDED_OPERATORS = {
+    ast.Pow: '_pow',
+    ast.Mult: '_mul',
+    ast.LShift: '_lshift',
+}
+
+# Builtins and math functions available to execute_calculation_tool,
+# built once at import; NumPy is added on first use (see _safe_names)
+_SAFE_NAMES = {
+    'abs': abs, 'round': round, 'min': min, 'max': max,
+    'sum': _guarded_sum, 'len': len, 'int': int, 'float': float,
+    'pow': pow, 'divmod': divmod,
+}
+_SAFE_NAMES.update({name: getattr(math, name) for name in dir(math) if not name.startswith('_')})
+_SAFE_NAMES.update({
+    'factorial': _guarded_factorial, 'comb': _guarded_comb, 'perm': _guarded_perm,
+    'prod': _guarded_prod, 'lcm': _guarded_lcm, 'gcd': _guarded_gcd,
+})
+_SAFE_NAMES.update({'_pow': _guarded_pow, '_mul': _guarded_mul, '_lshift': _guarded_lshift})
+
+
+# Syntax allowed in execute_calculation_tool expressions: literals, operators,
+# containers, comprehensions, subscripts and calls to plain names. Attribute
+# access is deliberately absent, which closes the usual eval() escapes.
+_ALLOWED_NODES = (
+    ast.Expression, ast.Constant, ast.Name, ast.Load, ast.Store,
+    ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+    ast.Call, ast.keyword, ast.Starred,
+    ast.List, ast.Tuple, ast.Set, ast.Dict,
+    ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.comprehension,
+    ast.Subscript, ast.Slice,
+)
+
+
+class _GuardOperators(ast.NodeTransformer):
+    """Rewrite size-sensitive binary operators into calls to their guards"""
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        guard = _GUARDED_OPERATORS.get(type(node.op))
+        if guard is None:
+            return node
+        return ast.copy_location(
+            ast.Call(func=ast.Name(id=guard, ctx=ast.Load()), args=[node.left, node.right], keywords=[]),
+            node
+        )
+
+
+@functools.lru_cache(maxsize=512)
+def _compile_expression(expression: str):
+    """
+    Parse, validate and compile a calculation expression.
+    Cached, so expressions repeated across agent turns skip parsing.
+
+    Args:
+        expression: Expression source
+
+    Returns:
+        Compiled code object for eval()
+
+    Raises:
+        ValueError: If the expression uses disallowed syntax
+    """
+    # Size-sensitive operators (**, *, <<) are compiled as calls to guards
+    # that reject oversized results before computing them (best-effort, see
+    # _MAX_INT_BITS)
+    tree = ast.parse(expression.strip(), mode='eval')
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in expression: {type(node).__name__}")
+        if isinstance(node, ast.Call) and not isinstance(node.func, ast.Name):
+            raise ValueError("Only calls to named functions are allowed")
+        if isinstance(node, ast.Name) and node.id.startswith('_'):
+            raise ValueError(f"Name not allowed in expression: {node.id}")
+
+    tree = ast.fix_missing_locations(_GuardOperators().visit(tree))
+    return compile(tree, '<expression>', 'eval')
+
+
+@functools.cache
+def _safe_names() -> Dict[str, Any]:
+    """
+    Globals for evaluating calculation expressions: the safe names plus the
+    NumPy statistics, with builtins disabled. Used as globals rather than
+    locals so names also resolve inside comprehensions.
+    """
+    np = _np()
+    names = {"__builtins__": {}, **_SAFE_NAMES}
+    names.update({name: getattr(np, name) for name in _NUMPY_FUNCS})
+    return names
+
+
+def _to_python(value: Any) -> Any:
+    """
+    Convert NumPy scalars and arrays, including ones nested in lists, tuples
+    and dicts, to plain Python values so results print as numbers rather
+    than np.float64(...) reprs.
+    """
+    np = _np()
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_python(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _to_python(item) for key, item in value.items()}
+    return value
+
+
 @tool
 def execute_calculation_tool(expression: str) -> str:
     """
     Execute a mathematical calculation or Python expression safely.
 
     Args:
-        expression: Mathematical expression to evaluate (e.g., "2 + 2", "sum([1,2,3])")
+        expression: Mathematical expression to evaluate (e.g., "2 + 2", "sum([1,2,3])",
+            "median([3,1,2])", "percentile([1,2,3,4], 90)")
 
     Returns:
         Result of the calculation
@@ -320,18 +1113,10 @@ def execute_calculation_tool(expression: str) -> str:
         logger.info(f"Executing calculation: {expression}")
 
         # Safe evaluation using restricted globals
-        allowed_names = {
-            'abs': abs, 'round': round, 'min': min, 'max': max,
-            'sum': sum, 'len': len, 'int': int, 'float': float,
-            'pow': pow, 'divmod': divmod,
-        }
+        result = eval(_compile_expression(expression), _safe_names())
 
-        # Also allow math functions
-        for name in dir(math):
-            if not name.startswith('_'):
-                allowed_names[name] = getattr(math, name)
-
-        result = eval(expression, {"__builtins__": {}}, allowed_names)
+        # Convert NumPy scalars/arrays back to plain Python values
+        result = _to_python(result)
 
         logger.info(f"Calculation result: {result}")
         return str(result)
@@ -345,8 +1130,115 @@ def execute_calculation_tool(expression: str) -> str:
 # Visualization Tools
 # ============================================================================
 
+# pyplot keeps global state, so charts are rendered one at a time
+_MPL_LOCK = threading.Lock()
+
+# One figure and output buffer reused for every chart (guarded by _MPL_LOCK),
+# so renders don't pay for figure, canvas and renderer setup each time
+_CHART_FIG = None
+_CHART_BUF = BytesIO()
+
+# Chart output formats: savefig options and MIME type. WebP is several times
+# smaller than PNG but needs Pillow; PNG stays the default so charts match
+# what quizzes usually ask for
+_IMAGE_FORMATS = {
+    'png': ({}, 'image/png'),
+    'webp': ({'pil_kwargs': {'quality': 85, 'method': 6}}, 'image/webp'),
+}
+
+
+def _chart_axes():
+    """
+    Return the shared chart figure with fresh axes for a new chart.
+    Caller must hold _MPL_LOCK.
+    """
+    global _CHART_FIG
+    if _CHART_FIG is None:
+        # Constrained layout is solved once at draw time, replacing the
+        # iterative tight_layout pass
+        _CHART_FIG = _plt().figure(figsize=(10, 6), constrained_layout=True)
+    else:
+        # Clear the figure rather than just the axes: ax.clear() keeps state
+        # such as the equal aspect and hidden frame a pie chart sets
+        _CHART_FIG.clear()
+    return _CHART_FIG, _CHART_FIG.add_subplot()
+
+
+def warmup_charts():
+    """
+    Import matplotlib and build the shared chart figure ahead of the first
+    chart, so no quiz request pays for font and renderer setup. Blocking.
+    """
+    if MATPLOTLIB_AVAILABLE:
+        with _MPL_LOCK:
+            _chart_axes()
+
+
+def _render_chart(params: Dict[str, Any]) -> str:
+    """
+    Render a chart to a base64 image data URI.
+    Blocking; called from a worker thread by create_visualization_tool.
+
+    Args:
+        params: Parsed visualization parameters
+
+    Returns:
+        Base64-encoded image URI (data:image/<format>;base64,...)
+    """
+    chart_type = params.get('type', 'bar')
+    data_input = params.get('data', '')
+    x_col = params.get('x_column')
+    y_col = params.get('y_column')
+    title = params.get('title', 'Chart')
+    image_format = str(params.get('format', 'png')).lower()
+    if image_format not in _IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format: {image_format}")
+
+    # Load data
+    pd = _pd()
+    if data_input.startswith('[') or data_input.startswith('{'):
+        df = pd.read_json(BytesIO(data_input.encode()))
+    else:
+        df = pd.read_csv(StringIO(data_input))
+
+    with _MPL_LOCK:
+        fig, ax = _chart_axes()
+        buf = _CHART_BUF
+        try:
+            if chart_type == 'bar':
+                df.plot(kind='bar', x=x_col, y=y_col, ax=ax)
+            elif chart_type == 'line':
+                df.plot(kind='line', x=x_col, y=y_col, ax=ax)
+            elif chart_type == 'scatter':
+                df.plot(kind='scatter', x=x_col, y=y_col, ax=ax)
+            elif chart_type == 'pie':
+                df.set_index(x_col)[y_col].plot(kind='pie', ax=ax)
+            else:
+                df.plot(ax=ax)
+
+            ax.set_title(title)
+
+            # Save to bytes buffer, falling back to PNG if this matplotlib
+            # build can't write the requested format
+            if image_format not in fig.canvas.get_supported_filetypes():
+                logger.warning(f"{image_format} output not supported, using png")
+                image_format = 'png'
+            savefig_kwargs, mime_type = _IMAGE_FORMATS[image_format]
+            fig.savefig(buf, format=image_format, dpi=90, **savefig_kwargs)
+
+            # Encode straight from the buffer's memory (no intermediate bytes
+            # copy); the view must be released before the buffer is reset
+            with buf.getbuffer() as view:
+                img_base64 = base64.b64encode(view).decode('ascii')
+        finally:
+            buf.seek(0)
+            buf.truncate()
+
+    return f"data:{mime_type};base64,{img_base64}"
+
+
 @tool
-def create_visualization_tool(viz_params: str) -> str:
+async def create_visualization_tool(viz_params: str) -> str:
     """
     Create a data visualization (chart/graph) and return as base64-encoded image.
 
@@ -357,9 +1249,10 @@ def create_visualization_tool(viz_params: str) -> str:
             - x_column: Column for x-axis
             - y_column: Column for y-axis
             - title: Chart title
+            - format: Image format (png or webp; default png)
 
     Returns:
-        Base64-encoded image URI (data:image/png;base64,...)
+        Base64-encoded image URI (data:image/<format>;base64,...)
     """
     if not MATPLOTLIB_AVAILABLE:
         return "Error: Matplotlib is not installed. Run: pip install matplotlib"
@@ -367,45 +1260,8 @@ def create_visualization_tool(viz_params: str) -> str:
     try:
         logger.info("Creating visualization")
 
-        params = json.loads(viz_params)
-        chart_type = params.get('type', 'bar')
-        data_input = params.get('data', '')
-        x_col = params.get('x_column')
-        y_col = params.get('y_column')
-        title = params.get('title', 'Chart')
-
-        # Load data
-        if data_input.startswith('[') or data_input.startswith('{'):
-            df = pd.read_json(BytesIO(data_input.encode()))
-        else:
-            df = pd.read_csv(StringIO(data_input))
-
-        # Create plot
-        fig, ax = plt.subplots(figsize=(10, 6))
-
-        if chart_type == 'bar':
-            df.plot(kind='bar', x=x_col, y=y_col, ax=ax)
-        elif chart_type == 'line':
-            df.plot(kind='line', x=x_col, y=y_col, ax=ax)
-        elif chart_type == 'scatter':
-            df.plot(kind='scatter', x=x_col, y=y_col, ax=ax)
-        elif chart_type == 'pie':
-            df.set_index(x_col)[y_col].plot(kind='pie', ax=ax)
-        else:
-            df.plot(ax=ax)
-
-        ax.set_title(title)
-        plt.tight_layout()
-
-        # Save to bytes buffer
-        buf = BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        buf.seek(0)
-        plt.close()
-
-        # Encode to base64
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        data_uri = f"data:image/png;base64,{img_base64}"
+        params = orjson.loads(viz_params)
+        data_uri = await asyncio.to_thread(_render_chart, params)
 
         logger.info("Visualization created successfully")
         return data_uri
@@ -420,7 +1276,7 @@ def create_visualization_tool(viz_params: str) -> str:
 # ============================================================================
 
 @tool
-def submit_answer_tool(submission_data: str) -> str:
+async def submit_answer_tool(submission_data: str) -> str:
     """
     Submit an answer to the quiz endpoint.
 
@@ -438,6 +1294,8 @@ def submit_answer_tool(submission_data: str) -> str:
     try:
         logger.info("Submitting answer")
 
+        # stdlib json keeps integers wider than 64 bits exact (orjson would
+        # turn them into floats), so large exact answers are submitted as-is
         params = json.loads(submission_data)
         submit_url = params.get('submit_url')
         email = params.get('email')
@@ -456,9 +1314,15 @@ def submit_answer_tool(submission_data: str) -> str:
             "answer": answer
         }
 
+        # Serialize once: the same bytes are size-checked and sent as the body.
+        # orjson rejects integers wider than 64 bits; stdlib json handles them
+        try:
+            payload_json = orjson.dumps(payload)
+        except TypeError:
+            payload_json = json.dumps(payload, separators=(',', ':')).encode()
+
         # Check payload size (must be under 1MB)
-        payload_json = json.dumps(payload)
-        payload_size = len(payload_json.encode('utf-8'))
+        payload_size = len(payload_json)
 
         if payload_size > 1_000_000:
             return f"Error: Payload size ({payload_size} bytes) exceeds 1MB limit"
@@ -467,10 +1331,11 @@ def submit_answer_tool(submission_data: str) -> str:
         logger.info(f"Answer: {answer}")
 
         # Submit
-        response = httpx.post(
+        response = await _HTTP.post(
             submit_url,
-            json=payload,
-            timeout=30.0
+            content=payload_json,
+            headers={"Content-Type": "application/json"},
+            follow_redirects=False
         )
 
         response_data = response.json()
@@ -499,14 +1364,16 @@ def submit_answer_tool(submission_data: str) -> str:
 # Export tools for agent
 # ============================================================================
 
-# Create tool list for easy import
-all_tools = [
+# Frozen tool registry, shared by every agent instance
+ALL_TOOLS = (
     fetch_webpage_tool,
     scrape_with_javascript_tool,
+    scrape_many_tool,
     download_file_tool,
     extract_data_from_pdf_tool,
+    extract_data_from_pdfs_tool,
     analyze_data_tool,
     execute_calculation_tool,
     create_visualization_tool,
     submit_answer_tool
-]
+)